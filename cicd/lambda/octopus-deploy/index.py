@@ -1,43 +1,189 @@
-# DEPRECATED: This file has been removed as part of Octopus Deploy elimination
-# 
-# As of August 2025, all Octopus Deploy functionality has been replaced 
-# with direct CodePipeline to ECS deployment for simplified CI/CD architecture.
+# Octopus Deploy integration for AWS CodePipeline
 #
-# Previous functionality:
-# - Octopus Deploy release creation
-# - Environment-specific deployments
-# - Application variable management
+# Invoked as a CodePipeline Lambda action: creates an Octopus release for the
+# built image, deploys it to the requested environment and reports the result
+# back to CodePipeline.
 #
-# Current replacement:
-# - Direct CodePipeline to ECS deployment via buildspec files
-# - AWS Parameter Store and Secrets Manager for configuration
-# - ECS service updates through AWS CodeDeploy
-#
-# For migration details, see:
-# - docs/CI_CD_SIMPLIFICATION.md
-# - docs/OCTOPUS_REMOVAL_COMPLETE.md
-# - cicd/buildspec/ directory for current deployment scripts
-#
-# This directory should be removed in the next cleanup cycle.
-    for space in spaces_response.json()['Items']:
-        if space['Name'] == space_name:
-            space_id = space['Id']
-            break
+# Pipelines that deploy directly to ECS via the cicd/buildspec/ files don't use
+# this function.
+
+import json
+import boto3
+import os
+import logging
+import hashlib
+import time
+import ijson
+import orjson
+import requests
+from concurrent.futures import ThreadPoolExecutor
+from requests.adapters import HTTPAdapter
+from urllib3.util.retry import Retry
+from typing import Dict, Any, List, Optional, Tuple
+
+# Configure logging
+logger = logging.getLogger()
+logger.setLevel(logging.INFO)
+
+# Initialize AWS clients
+ssm_client = boto3.client('ssm')
+codepipeline_client = boto3.client('codepipeline')
+
+# How long a deployment may run, across CodePipeline continuations, before the job is failed
+DEPLOYMENT_TIMEOUT_SECONDS = 15 * 60
+
+# (connect, read) timeout for every Octopus request, so a stalled socket can't hang the invocation
+OCTOPUS_REQUEST_TIMEOUT = (3.05, 10)
+
+# Shared HTTP session so warm invocations reuse the TCP/TLS connection to Octopus
+SESSION = requests.Session()
+SESSION.mount('https://', HTTPAdapter(
+    pool_connections=1,
+    pool_maxsize=4,
+    max_retries=Retry(total=3, backoff_factor=0.5, status_forcelist=[502, 503, 504])
+))
+
+# SSM parameter values, cached across warm invocations as (value, fetched_at)
+_SSM_CACHE: Dict[tuple, tuple] = {}
+
+# Octopus name -> ID lookups, cached across warm invocations as (value, inserted_at)
+ID_CACHE_TTL_SECONDS = 3600
+_ID_CACHE: Dict[tuple, tuple] = {}
+
+def get_parameters(names: List[str], encrypted: bool = False) -> Dict[str, str]:
+    """Get parameters from SSM Parameter Store, batching up to 10 names per request"""
+    
+    values = {}
+    for i in range(0, len(names), 10):
+        response = ssm_client.get_parameters(Names=names[i:i + 10], WithDecryption=encrypted)
+        if response['InvalidParameters']:
+            raise Exception(f"Parameters not found: {', '.join(response['InvalidParameters'])}")
+        values.update({parameter['Name']: parameter['Value'] for parameter in response['Parameters']})
+    return values
+
+def get_parameters_cached(names: List[str], encrypted: bool = False, ttl: int = 300) -> Dict[str, str]:
+    """Get parameters from SSM Parameter Store, fetching only names not cached within the last ttl seconds"""
+    
+    values = {}
+    missing = []
+    for name in names:
+        entry = _SSM_CACHE.get((name, encrypted))
+        if entry and time.monotonic() - entry[1] < ttl:
+            values[name] = entry[0]
+        else:
+            missing.append(name)
+    
+    if missing:
+        fetched = get_parameters(missing, encrypted=encrypted)
+        fetched_at = time.monotonic()
+        for name, value in fetched.items():
+            _SSM_CACHE[(name, encrypted)] = (value, fetched_at)
+        values.update(fetched)
+    
+    return values
+
+def get_parameter_cached(name: str, encrypted: bool = False, ttl: int = 300) -> str:
+    """Get a single parameter from SSM Parameter Store through the cache"""
+    
+    return get_parameters_cached([name], encrypted=encrypted, ttl=ttl)[name]
+
+def _space_cache_key(server_url: str, api_key: str, space_name: str) -> tuple:
+    # Key on a hash of the API key so the key itself is never held in the cache
+    return ('space', server_url, hashlib.sha256(api_key.encode()).hexdigest(), space_name)
+
+def _environment_cache_key(server_url: str, api_key: str, space_id: str, environment_name: str) -> tuple:
+    return ('environment', server_url, hashlib.sha256(api_key.encode()).hexdigest(), space_id, environment_name)
+
+def _cached_id(key: tuple) -> Optional[str]:
+    """Return a cached Octopus ID if present and within its TTL"""
+    
+    entry = _ID_CACHE.get(key)
+    if entry and time.monotonic() - entry[1] < ID_CACHE_TTL_SECONDS:
+        return entry[0]
+    return None
+
+def _raise_for_status(response: requests.Response, cache_key: Optional[tuple]) -> None:
+    """Drop a cached ID the server no longer recognises before raising for the response status"""
+    
+    if cache_key and response.status_code in (401, 404):
+        _ID_CACHE.pop(cache_key, None)
+    response.raise_for_status()
+
+def _stream_find_id(
+    url: str,
+    name: str,
+    stale_cache_key: Optional[tuple] = None
+) -> Optional[str]:
+    """
+    Find the ID of the named item in an Octopus collection, streaming the
+    response and stopping at the first match rather than loading every item
+    """
+    
+    # partialName narrows the collection server-side; the exact match is still checked below
+    with SESSION.get(url, params={'partialName': name}, stream=True, timeout=OCTOPUS_REQUEST_TIMEOUT) as response:
+        _raise_for_status(response, stale_cache_key)
+        response.raw.decode_content = True
+        return next((item['Id'] for item in ijson.items(response.raw, 'Items.item') if item['Name'] == name), None)
+
+def _resolve_space_id(server_url: str, api_key: str, space_name: str) -> str:
+    """Resolve a space name to its ID"""
+    
+    cache_key = _space_cache_key(server_url, api_key, space_name)
+    space_id = _cached_id(cache_key)
+    if space_id:
+        return space_id
     
+    space_id = _stream_find_id(f"{server_url}/api/spaces", space_name)
     if not space_id:
         raise Exception(f"Space '{space_name}' not found")
     
-    # Get project ID
-    projects_url = f"{server_url}/api/{space_id}/projects"
-    projects_response = requests.get(projects_url, headers=headers)
-    projects_response.raise_for_status()
+    _ID_CACHE[cache_key] = (space_id, time.monotonic())
+    return space_id
+
+def _resolve_environment_id(server_url: str, api_key: str, space_id: str, environment_name: str) -> str:
+    """Resolve an environment name within a space to its ID"""
+    
+    cache_key = _environment_cache_key(server_url, api_key, space_id, environment_name)
+    environment_id = _cached_id(cache_key)
+    if environment_id:
+        return environment_id
     
-    project_id = None
-    for project in projects_response.json()['Items']:
-        if project['Name'] == project_name:
-            project_id = project['Id']
-            break
+    # /environments is paged; /environments/all returns every environment in the space as one list
+    environments_url = f"{server_url}/api/{space_id}/environments/all"
+    environments_response = SESSION.get(environments_url, timeout=OCTOPUS_REQUEST_TIMEOUT)
+    environments_response.raise_for_status()
+    
+    # Index every environment in one pass so later deployments to other environments hit the cache too
+    environment_ids = {e['Name']: e['Id'] for e in orjson.loads(environments_response.content)}
+    inserted_at = time.monotonic()
+    for name, item_id in environment_ids.items():
+        _ID_CACHE[_environment_cache_key(server_url, api_key, space_id, name)] = (item_id, inserted_at)
     
+    environment_id = environment_ids.get(environment_name)
+    if not environment_id:
+        raise Exception(f"Environment '{environment_name}' not found")
+    
+    return environment_id
+
+def create_octopus_release(
+    server_url: str,
+    api_key: str,
+    space_name: str,
+    project_name: str,
+    version: str,
+    image_uri: str
+) -> Dict[str, Any]:
+    """Create a new release in Octopus Deploy"""
+    
+    # Get space ID
+    space_id = _resolve_space_id(server_url, api_key, space_name)
+    
+    # Get project ID
+    project_id = _stream_find_id(
+        f"{server_url}/api/{space_id}/projects",
+        project_name,
+        stale_cache_key=_space_cache_key(server_url, api_key, space_name)
+    )
     if not project_id:
         raise Exception(f"Project '{project_name}' not found")
     
@@ -50,10 +196,10 @@
     }
     
     releases_url = f"{server_url}/api/{space_id}/releases"
-    release_response = requests.post(releases_url, headers=headers, json=release_data)
+    release_response = SESSION.post(releases_url, data=orjson.dumps(release_data), timeout=OCTOPUS_REQUEST_TIMEOUT)
     release_response.raise_for_status()
     
-    return release_response.json()
+    return orjson.loads(release_response.content)
 
 def deploy_release(
     server_url: str,
@@ -64,24 +210,8 @@ def deploy_release(
 ) -> Dict[str, Any]:
     """Deploy a release to specified environment"""
     
-    headers = {
-        'X-Octopus-ApiKey': api_key,
-        'Content-Type': 'application/json'
-    }
-    
     # Get environment ID
-    environments_url = f"{server_url}/api/{space_id}/environments"
-    environments_response = requests.get(environments_url, headers=headers)
-    environments_response.raise_for_status()
-    
-    environment_id = None
-    for env in environments_response.json()['Items']:
-        if env['Name'] == environment_name:
-            environment_id = env['Id']
-            break
-    
-    if not environment_id:
-        raise Exception(f"Environment '{environment_name}' not found")
+    environment_id = _resolve_environment_id(server_url, api_key, space_id, environment_name)
     
     # Create deployment
     deployment_data = {
@@ -91,50 +221,64 @@ def deploy_release(
     }
     
     deployments_url = f"{server_url}/api/{space_id}/deployments"
-    deployment_response = requests.post(deployments_url, headers=headers, json=deployment_data)
-    deployment_response.raise_for_status()
+    deployment_response = SESSION.post(deployments_url, data=orjson.dumps(deployment_data), timeout=OCTOPUS_REQUEST_TIMEOUT)
+    _raise_for_status(deployment_response, _environment_cache_key(server_url, api_key, space_id, environment_name))
     
-    return deployment_response.json()
+    return orjson.loads(deployment_response.content)
 
-def wait_for_deployment(
+def get_deployment_state(
     server_url: str,
-    api_key: str,
     space_id: str,
     deployment_id: str,
-    timeout_minutes: int = 15
-) -> bool:
-    """Wait for deployment to complete"""
+    etag: Optional[str] = None
+) -> Tuple[Optional[str], Optional[str]]:
+    """
+    Poll a deployment once.
     
-    import time
+    Returns (state, etag). state is None when the deployment is unchanged
+    since etag or the poll hit a transient error (5xx, connection failure or
+    timeout); poll again later.
+    """
     
-    headers = {
-        'X-Octopus-ApiKey': api_key,
-        'Content-Type': 'application/json'
-    }
+    deployment_url = f"{server_url}/api/{space_id}/deployments/{deployment_id}"
     
-    start_time = time.time()
-    timeout_seconds = timeout_minutes * 60
+    try:
+        # Conditional GET: an unchanged deployment comes back as an empty 304
+        response = SESSION.get(
+            deployment_url,
+            headers={'If-None-Match': etag} if etag else None,
+            timeout=OCTOPUS_REQUEST_TIMEOUT
+        )
+    except (requests.exceptions.RetryError, requests.exceptions.ConnectionError, requests.exceptions.Timeout) as e:
+        # Leave failing the job to the overall deployment timeout rather than a single bad poll
+        logger.warning(f"Transient error polling deployment {deployment_id}: {str(e)}")
+        return None, etag
     
-    while time.time() - start_time < timeout_seconds:
-        deployment_url = f"{server_url}/api/{space_id}/deployments/{deployment_id}"
-        response = requests.get(deployment_url, headers=headers)
-        response.raise_for_status()
-        
-        deployment = response.json()
-        state = deployment.get('State', '')
-        
-        logger.info(f"Deployment {deployment_id} state: {state}")
-        
-        if state in ['Success', 'Failed', 'Canceled', 'TimedOut']:
-            return state == 'Success'
-        
-        time.sleep(30)  # Wait 30 seconds before checking again
+    if response.status_code >= 500:
+        logger.warning(f"Transient error polling deployment {deployment_id}: HTTP {response.status_code}")
+        return None, etag
+    
+    if response.status_code == 304:
+        logger.info(f"Deployment {deployment_id} unchanged")
+        return None, etag
+    
+    response.raise_for_status()
     
-    logger.error(f"Deployment {deployment_id} timed out after {timeout_minutes} minutes")
-    return False
+    deployment = orjson.loads(response.content)
+    state = deployment.get('State', '')
+    
+    logger.info(f"Deployment {deployment_id} state: {state}")
+    
+    return state, response.headers.get('ETag')
 
 def handler(event, context):
-    """Lambda handler for Octopus Deploy integration"""
+    """
+    Lambda handler for Octopus Deploy integration.
+    
+    The first invocation creates the release and deployment; while the deployment
+    is running each invocation polls it once and hands CodePipeline a continuation
+    token, so CodePipeline re-invokes us instead of a Lambda blocking on the wait.
+    """
     
     try:
         logger.info(f"Received event: {json.dumps(event)}")
@@ -152,88 +296,135 @@ def handler(event, context):
         environment_name = user_parameters.get('environment', '')
         version = user_parameters.get('version', '')
         
-        # Get API key from parameter store
-        api_key = get_parameter('/ecs-modernization/octopus-api-key', encrypted=True)
-        
-        # Get image URI from input artifacts (this would be passed from the build stage)
-        input_artifacts = job.get('data', {}).get('inputArtifacts', [])
-        image_uri = f"123456789012.dkr.ecr.us-east-1.amazonaws.com/ecs-modernization/{project_name}:{version}"
-        
-        logger.info(f"Deploying {project_name} version {version} to {environment_name}")
-        
-        # Create release in Octopus Deploy
-        release = create_octopus_release(
-            server_url=server_url,
-            api_key=api_key,
-            space_name=space_name,
-            project_name=project_name.upper() + "-System",  # Convert to project naming convention
-            version=version,
-            image_uri=image_uri
-        )
+        # Get API key from parameter store and authenticate every Octopus request made on the shared session
+        api_key = get_parameter_cached('/ecs-modernization/octopus-api-key', encrypted=True)
+        SESSION.headers.update({
+            'X-Octopus-ApiKey': api_key,
+            'Content-Type': 'application/json'
+        })
         
-        logger.info(f"Created release: {release['Id']}")
+        # A continuation token means an earlier invocation already started the deployment
+        continuation_token = job.get('data', {}).get('continuationToken')
         
-        # Deploy the release
-        deployment = deploy_release(
-            server_url=server_url,
-            api_key=api_key,
-            space_id=release['SpaceId'],
-            release_id=release['Id'],
-            environment_name=environment_name
-        )
-        
-        logger.info(f"Started deployment: {deployment['Id']}")
+        if continuation_token:
+            continuation = json.loads(continuation_token)
+            
+            logger.info(f"Checking deployment: {continuation['deploymentId']}")
+        else:
+            # Get image URI from input artifacts (this would be passed from the build stage)
+            input_artifacts = job.get('data', {}).get('inputArtifacts', [])
+            image_uri = f"123456789012.dkr.ecr.us-east-1.amazonaws.com/ecs-modernization/{project_name}:{version}"
+            
+            logger.info(f"Deploying {project_name} version {version} to {environment_name}")
+            
+            space_id = _resolve_space_id(server_url, api_key, space_name)
+            
+            # On a cold cache, overlap the environment lookup with release creation since it
+            # doesn't depend on the release; a warm container already has the ID cached
+            executor = None
+            if not _cached_id(_environment_cache_key(server_url, api_key, space_id, environment_name)):
+                executor = ThreadPoolExecutor(max_workers=1)
+                environment_lookup = executor.submit(_resolve_environment_id, server_url, api_key, space_id, environment_name)
+            
+            try:
+                # Create release in Octopus Deploy
+                release = create_octopus_release(
+                    server_url=server_url,
+                    api_key=api_key,
+                    space_name=space_name,
+                    project_name=project_name.upper() + "-System",  # Convert to project naming convention
+                    version=version,
+                    image_uri=image_uri
+                )
+                
+                logger.info(f"Created release: {release['Id']}")
+                
+                # Surface lookup failures before deploying; the resolved ID is served from cache below
+                if executor:
+                    environment_lookup.result()
+            finally:
+                if executor:
+                    executor.shutdown()
+            
+            # Deploy the release
+            deployment = deploy_release(
+                server_url=server_url,
+                api_key=api_key,
+                space_id=release['SpaceId'],
+                release_id=release['Id'],
+                environment_name=environment_name
+            )
+            
+            logger.info(f"Started deployment: {deployment['Id']}")
+            
+            continuation = {
+                'spaceId': release['SpaceId'],
+                'releaseId': release['Id'],
+                'deploymentId': deployment['Id'],
+                'startedAt': time.time(),
+                'etag': None
+            }
         
-        # Wait for deployment to complete
-        success = wait_for_deployment(
+        # Check the deployment once; CodePipeline re-invokes us while it is still running
+        state, continuation['etag'] = get_deployment_state(
             server_url=server_url,
-            api_key=api_key,
-            space_id=release['SpaceId'],
-            deployment_id=deployment['Id'],
-            timeout_minutes=15
+            space_id=continuation['spaceId'],
+            deployment_id=continuation['deploymentId'],
+            etag=continuation['etag']
         )
         
-        if success:
-            logger.info(f"Deployment {deployment['Id']} completed successfully")
+        if state == 'Success':
+            logger.info(f"Deployment {continuation['deploymentId']} completed successfully")
             
             # Notify CodePipeline of success
-            codepipeline = boto3.client('codepipeline')
-            codepipeline.put_job_success_result(jobId=job_id)
+            codepipeline_client.put_job_success_result(jobId=job_id)
             
             return {
                 'statusCode': 200,
                 'body': json.dumps({
                     'message': 'Deployment successful',
-                    'releaseId': release['Id'],
-                    'deploymentId': deployment['Id']
+                    'releaseId': continuation['releaseId'],
+                    'deploymentId': continuation['deploymentId']
                 })
             }
-        else:
-            logger.error(f"Deployment {deployment['Id']} failed")
+        
+        if state in ['Failed', 'Canceled', 'TimedOut'] or time.time() - continuation['startedAt'] > DEPLOYMENT_TIMEOUT_SECONDS:
+            reason = state if state in ['Failed', 'Canceled', 'TimedOut'] else 'not finished in time'
+            logger.error(f"Deployment {continuation['deploymentId']} failed: {reason}")
             
             # Notify CodePipeline of failure
-            codepipeline = boto3.client('codepipeline')
-            codepipeline.put_job_failure_result(
+            codepipeline_client.put_job_failure_result(
                 jobId=job_id,
-                failureDetails={'message': 'Octopus Deploy deployment failed', 'type': 'JobFailed'}
+                failureDetails={'message': f'Octopus Deploy deployment failed: {reason}', 'type': 'JobFailed'}
             )
             
             return {
                 'statusCode': 500,
                 'body': json.dumps({
                     'message': 'Deployment failed',
-                    'releaseId': release['Id'],
-                    'deploymentId': deployment['Id']
+                    'releaseId': continuation['releaseId'],
+                    'deploymentId': continuation['deploymentId']
                 })
             }
+        
+        # Still running - hand CodePipeline a continuation token to check again
+        codepipeline_client.put_job_success_result(jobId=job_id, continuationToken=json.dumps(continuation))
+        
+        return {
+            'statusCode': 202,
+            'body': json.dumps({
+                'message': 'Deployment in progress',
+                'releaseId': continuation['releaseId'],
+                'deploymentId': continuation['deploymentId']
+            })
+        }
             
     except Exception as e:
         logger.error(f"Error in Lambda handler: {str(e)}")
         
         # Notify CodePipeline of failure if job_id is available
         if 'job_id' in locals():
-            codepipeline = boto3.client('codepipeline')
-            codepipeline.put_job_failure_result(
+            codepipeline_client.put_job_failure_result(
                 jobId=job_id,
                 failureDetails={'message': str(e), 'type': 'JobFailed'}
             )
@@ -1,10 +1,10 @@
 import json
 import boto3
-import os
 import logging
-import random
+import secrets
 import string
-from datetime import datetime, timedelta
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from datetime import datetime, timedelta, timezone
 from typing import Dict, Any
 
 # Configure logging
@@ -13,8 +13,13 @@ logger.setLevel(logging.INFO)
 
 # Initialize AWS clients
 secrets_client = boto3.client('secretsmanager')
-ssm_client = boto3.client('ssm')
-kms_client = boto3.client('kms')
+
+# Maximum number of secrets rotated concurrently
+ROTATION_MAX_WORKERS = 8
+
+# Password generation character classes; every password contains at least one of each
+PASSWORD_POOLS = (string.ascii_lowercase, string.ascii_uppercase, string.digits, "!@#$%^&*")
+PASSWORD_ALPHABET = ''.join(PASSWORD_POOLS)
 
 def handler(event: Dict[str, Any], context: Any) -> Dict[str, Any]:
     """
@@ -23,21 +28,16 @@ def handler(event: Dict[str, Any], context: Any) -> Dict[str, Any]:
     try:
         logger.info(f"Starting secrets rotation process: {json.dumps(event)}")
         
-        # Get KMS key ID from environment
-        kms_key_id = os.environ.get('KMS_KEY_ID')
-        if not kms_key_id:
-            raise ValueError("KMS_KEY_ID environment variable not set")
-        
         # Rotate secrets based on event type
         if 'source' in event and event['source'] == 'aws.events':
             # Scheduled rotation
-            results = rotate_scheduled_secrets(kms_key_id)
+            results = rotate_scheduled_secrets()
         elif 'SecretId' in event:
             # Manual rotation triggered by Secrets Manager
-            results = rotate_specific_secret(event['SecretId'], kms_key_id)
+            results = rotate_specific_secret(event['SecretId'])
         else:
             # Default: rotate all applicable secrets
-            results = rotate_all_secrets(kms_key_id)
+            results = rotate_all_secrets()
         
         logger.info(f"Secrets rotation completed successfully: {results}")
         
@@ -46,7 +46,7 @@ def handler(event: Dict[str, Any], context: Any) -> Dict[str, Any]:
             'body': json.dumps({
                 'message': 'Secrets rotation completed successfully',
                 'results': results,
-                'timestamp': datetime.utcnow().isoformat()
+                'timestamp': datetime.now(timezone.utc).isoformat()
             })
         }
         
@@ -56,11 +56,11 @@ def handler(event: Dict[str, Any], context: Any) -> Dict[str, Any]:
             'statusCode': 500,
             'body': json.dumps({
                 'error': str(e),
-                'timestamp': datetime.utcnow().isoformat()
+                'timestamp': datetime.now(timezone.utc).isoformat()
             })
         }
 
-def rotate_scheduled_secrets(kms_key_id: str) -> Dict[str, Any]:
+def rotate_scheduled_secrets() -> Dict[str, Any]:
     """
     Rotate secrets that are due for scheduled rotation
     """
@@ -70,33 +70,29 @@ def rotate_scheduled_secrets(kms_key_id: str) -> Dict[str, Any]:
         'failed_secrets': []
     }
     
+    # Secrets last changed before this are due for rotation
+    rotation_threshold = datetime.now(timezone.utc) - timedelta(days=90)
+    secrets_to_rotate = []
+    
     try:
-        # List all secrets with the specific prefix
+        # List secrets with the specific prefix, filtered server-side
         paginator = secrets_client.get_paginator('list_secrets')
+        pages = paginator.paginate(
+            Filters=[{'Key': 'name', 'Values': ['ecs-modernization/']}],
+            PaginationConfig={'PageSize': 100}
+        )
         
-        for page in paginator.paginate():
+        for page in pages:
             for secret in page['SecretList']:
                 secret_name = secret['Name']
                 
-                # Only rotate secrets in our namespace
+                # The name filter is a case-insensitive prefix match; keep the exact namespace check
                 if not secret_name.startswith('ecs-modernization/'):
                     continue
                 
                 # Check if secret needs rotation
-                if should_rotate_secret(secret):
-                    try:
-                        rotate_result = rotate_secret_by_type(secret_name, kms_key_id)
-                        results['rotated_secrets'].append({
-                            'name': secret_name,
-                            'result': rotate_result
-                        })
-                        logger.info(f"Successfully rotated secret: {secret_name}")
-                    except Exception as e:
-                        logger.error(f"Failed to rotate secret {secret_name}: {str(e)}")
-                        results['failed_secrets'].append({
-                            'name': secret_name,
-                            'error': str(e)
-                        })
+                if should_rotate_secret(secret, rotation_threshold):
+                    secrets_to_rotate.append(secret_name)
                 else:
                     results['skipped_secrets'].append(secret_name)
                     logger.info(f"Skipped secret (not due for rotation): {secret_name}")
@@ -105,14 +101,37 @@ def rotate_scheduled_secrets(kms_key_id: str) -> Dict[str, Any]:
         logger.error(f"Error listing secrets: {str(e)}")
         raise
     
+    # Each rotation is an independent get/update round-trip, so rotate concurrently
+    with ThreadPoolExecutor(max_workers=ROTATION_MAX_WORKERS) as executor:
+        futures = {
+            executor.submit(rotate_secret_by_type, secret_name): secret_name
+            for secret_name in secrets_to_rotate
+        }
+        
+        for future in as_completed(futures):
+            secret_name = futures[future]
+            try:
+                rotate_result = future.result()
+                results['rotated_secrets'].append({
+                    'name': secret_name,
+                    'result': rotate_result
+                })
+                logger.info(f"Successfully rotated secret: {secret_name}")
+            except Exception as e:
+                logger.error(f"Failed to rotate secret {secret_name}: {str(e)}")
+                results['failed_secrets'].append({
+                    'name': secret_name,
+                    'error': str(e)
+                })
+    
     return results
 
-def rotate_specific_secret(secret_id: str, kms_key_id: str) -> Dict[str, Any]:
+def rotate_specific_secret(secret_id: str) -> Dict[str, Any]:
     """
     Rotate a specific secret
     """
     try:
-        result = rotate_secret_by_type(secret_id, kms_key_id)
+        result = rotate_secret_by_type(secret_id)
         return {
             'secret_id': secret_id,
             'result': result,
@@ -126,13 +145,13 @@ def rotate_specific_secret(secret_id: str, kms_key_id: str) -> Dict[str, Any]:
             'status': 'failed'
         }
 
-def rotate_all_secrets(kms_key_id: str) -> Dict[str, Any]:
+def rotate_all_secrets() -> Dict[str, Any]:
     """
     Rotate all applicable secrets
     """
-    return rotate_scheduled_secrets(kms_key_id)
+    return rotate_scheduled_secrets()
 
-def should_rotate_secret(secret: Dict[str, Any]) -> bool:
+def should_rotate_secret(secret: Dict[str, Any], rotation_threshold: datetime) -> bool:
     """
     Determine if a secret should be rotated based on last rotation date
     """
@@ -141,35 +160,20 @@ def should_rotate_secret(secret: Dict[str, Any]) -> bool:
     if not last_changed:
         return True  # Never been rotated
     
-    # Check if it's been more than 90 days since last rotation
-    rotation_threshold = datetime.utcnow() - timedelta(days=90)
+    # Check if it was last rotated before the threshold
     return last_changed < rotation_threshold
 
-def rotate_secret_by_type(secret_name: str, kms_key_id: str) -> Dict[str, Any]:
+def store_rotated_secret(secret_name: str, new_secret: Dict[str, Any]) -> None:
     """
-    Rotate secret based on its type and content
+    Store the new secret value as a new AWSCURRENT version
     """
-    try:
-        # Get current secret value
-        response = secrets_client.get_secret_value(SecretId=secret_name)
-        current_secret = json.loads(response['SecretString'])
-        
-        # Determine secret type and rotate accordingly
-        if 'database' in secret_name:
-            return rotate_database_secret(secret_name, current_secret, kms_key_id)
-        elif 'api-secrets' in secret_name:
-            return rotate_api_secret(secret_name, current_secret, kms_key_id)
-        elif 'jwt' in secret_name or 'api' in secret_name:
-            return rotate_token_secret(secret_name, current_secret, kms_key_id)
-        else:
-            # Generic rotation for other secret types
-            return rotate_generic_secret(secret_name, current_secret, kms_key_id)
-            
-    except Exception as e:
-        logger.error(f"Error rotating secret {secret_name}: {str(e)}")
-        raise
+    # The secret's existing KMS key is used, so no KmsKeyId (and no extra KMS call) is needed
+    secrets_client.put_secret_value(
+        SecretId=secret_name,
+        SecretString=json.dumps(new_secret)
+    )
 
-def rotate_database_secret(secret_name: str, current_secret: Dict[str, Any], kms_key_id: str) -> Dict[str, Any]:
+def rotate_database_secret(secret_name: str, current_secret: Dict[str, Any]) -> Dict[str, Any]:
     """
     Rotate database credentials
     """
@@ -181,20 +185,16 @@ def rotate_database_secret(secret_name: str, current_secret: Dict[str, Any], kms
     new_secret['password'] = new_password
     
     # Store the new secret
-    secrets_client.update_secret(
-        SecretId=secret_name,
-        SecretString=json.dumps(new_secret),
-        KmsKeyId=kms_key_id
-    )
+    store_rotated_secret(secret_name, new_secret)
     
     logger.info(f"Rotated database secret: {secret_name}")
     return {
         'type': 'database',
         'action': 'password_rotated',
-        'timestamp': datetime.utcnow().isoformat()
+        'timestamp': datetime.now(timezone.utc).isoformat()
     }
 
-def rotate_api_secret(secret_name: str, current_secret: Dict[str, Any], kms_key_id: str) -> Dict[str, Any]:
+def rotate_api_secret(secret_name: str, current_secret: Dict[str, Any]) -> Dict[str, Any]:
     """
     Rotate API secrets (JWT, encryption keys, etc.)
     """
@@ -217,20 +217,16 @@ def rotate_api_secret(secret_name: str, current_secret: Dict[str, Any], kms_key_
         new_secret['webhook_secret'] = generate_secure_token(32)
     
     # Store the new secret
-    secrets_client.update_secret(
-        SecretId=secret_name,
-        SecretString=json.dumps(new_secret),
-        KmsKeyId=kms_key_id
-    )
+    store_rotated_secret(secret_name, new_secret)
     
     logger.info(f"Rotated API secret: {secret_name}")
     return {
         'type': 'api_secret',
         'action': 'keys_rotated',
-        'timestamp': datetime.utcnow().isoformat()
+        'timestamp': datetime.now(timezone.utc).isoformat()
     }
 
-def rotate_token_secret(secret_name: str, current_secret: Dict[str, Any], kms_key_id: str) -> Dict[str, Any]:
+def rotate_token_secret(secret_name: str, current_secret: Dict[str, Any]) -> Dict[str, Any]:
     """
     Rotate token-based secrets
     """
@@ -241,20 +237,16 @@ def rotate_token_secret(secret_name: str, current_secret: Dict[str, Any], kms_ke
         new_secret['token'] = generate_secure_token(64)
     
     # Store the new secret
-    secrets_client.update_secret(
-        SecretId=secret_name,
-        SecretString=json.dumps(new_secret),
-        KmsKeyId=kms_key_id
-    )
+    store_rotated_secret(secret_name, new_secret)
     
     logger.info(f"Rotated token secret: {secret_name}")
     return {
         'type': 'token',
         'action': 'token_rotated',
-        'timestamp': datetime.utcnow().isoformat()
+        'timestamp': datetime.now(timezone.utc).isoformat()
     }
 
-def rotate_generic_secret(secret_name: str, current_secret: Dict[str, Any], kms_key_id: str) -> Dict[str, Any]:
+def rotate_generic_secret(secret_name: str, current_secret: Dict[str, Any]) -> Dict[str, Any]:
     """
     Generic rotation for other secret types
     """
@@ -263,34 +255,53 @@ def rotate_generic_secret(secret_name: str, current_secret: Dict[str, Any], kms_
     return {
         'type': 'generic',
         'action': 'reviewed_only',
-        'timestamp': datetime.utcnow().isoformat()
+        'timestamp': datetime.now(timezone.utc).isoformat()
     }
 
+# Rotation handler by secret name marker, checked in order; the first marker found in the name wins
+SECRET_TYPE_HANDLERS = (
+    ('database', rotate_database_secret),
+    ('api-secrets', rotate_api_secret),
+    ('jwt', rotate_token_secret),
+    ('api', rotate_token_secret)
+)
+
+def rotate_secret_by_type(secret_name: str) -> Dict[str, Any]:
+    """
+    Rotate secret based on its type and content
+    """
+    try:
+        # Get current secret value
+        response = secrets_client.get_secret_value(SecretId=secret_name)
+        current_secret = json.loads(response['SecretString'])
+        
+        # Determine secret type and rotate accordingly; generic rotation for other secret types
+        rotate = next((h for marker, h in SECRET_TYPE_HANDLERS if marker in secret_name), rotate_generic_secret)
+        return rotate(secret_name, current_secret)
+            
+    except Exception as e:
+        logger.error(f"Error rotating secret {secret_name}: {str(e)}")
+        raise
+
 def generate_secure_password(length: int = 32) -> str:
     """
     Generate a secure password with mixed case, numbers, and symbols
     """
-    characters = string.ascii_letters + string.digits + "!@#$%^&*"
-    password = ''.join(random.choice(characters) for _ in range(length))
+    if length < len(PASSWORD_POOLS):
+        raise ValueError(f"Password length must be at least {len(PASSWORD_POOLS)}")
     
-    # Ensure password contains at least one of each character type
-    if not any(c.islower() for c in password):
-        password = password[:-1] + random.choice(string.ascii_lowercase)
-    if not any(c.isupper() for c in password):
-        password = password[:-1] + random.choice(string.ascii_uppercase)
-    if not any(c.isdigit() for c in password):
-        password = password[:-1] + random.choice(string.digits)
-    if not any(c in "!@#$%^&*" for c in password):
-        password = password[:-1] + random.choice("!@#$%^&*")
+    # Place one character from each class, fill the rest from the full alphabet, then shuffle
+    password = [secrets.choice(pool) for pool in PASSWORD_POOLS]
+    password += [secrets.choice(PASSWORD_ALPHABET) for _ in range(length - len(PASSWORD_POOLS))]
+    secrets.SystemRandom().shuffle(password)
     
-    return password
+    return ''.join(password)
 
 def generate_secure_token(length: int = 64) -> str:
     """
-    Generate a secure token for API keys and secrets
+    Generate a secure URL-safe token for API keys and secrets
     """
-    characters = string.ascii_letters + string.digits
-    return ''.join(random.choice(characters) for _ in range(length))
+    return secrets.token_urlsafe(length)[:length]
 
 def generate_api_key() -> str:
     """
@@ -399,12 +399,6 @@ resource "aws_lambda_function" "secrets_rotation" {
   runtime         = "python3.9"
   timeout         = 300
   
-  environment {
-    variables = {
-      KMS_KEY_ID = aws_kms_key.secrets.key_id
-    }
-  }
-  
   tags = {
     Name = "${var.project_name}-secrets-rotation"
   }